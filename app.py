@@ -2,8 +2,7 @@
 
 import dash
 import dash_bootstrap_components as dbc
-from layout import get_layout
-from callbacks import register_callbacks
+from flask import request
 import logging
 import os
 from logging.handlers import RotatingFileHandler
@@ -33,8 +32,9 @@ if LOG_LEVEL not in ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']:
     LOG_LEVEL = 'DEBUG'  # Fallback to DEBUG if invalid level is set
 
 # Create a RotatingFileHandler to handle log file rotation
+# The log file is only opened when the first record is written
 file_handler = RotatingFileHandler(
-    LOG_PATH, maxBytes=5*1024*1024, backupCount=5
+    LOG_PATH, maxBytes=5*1024*1024, backupCount=5, delay=True
 )
 file_handler.setLevel(LOG_LEVEL)  # Set the logging level for the file handler
 file_handler.setFormatter(logging.Formatter(
@@ -48,16 +48,29 @@ stream_handler.setFormatter(logging.Formatter(
     '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 ))  # Define the log message format
 
+# Retrieve the deployment environment from the environment variable 'DASH_ENV'
+# Console output is only enabled outside production
+DASH_ENV = os.getenv('DASH_ENV', 'development').lower()
+
 # Configure the root logger with the defined handlers
 logger = logging.getLogger()
-logger.setLevel(logging.DEBUG)  # Base logging level
+# Base logging level; records below LOG_LEVEL are discarded before they are created,
+# which also lets `logger.isEnabledFor(logging.DEBUG)` guards skip debug-only work
+logger.setLevel(LOG_LEVEL)
 logger.addHandler(file_handler)
-logger.addHandler(stream_handler)
+if DASH_ENV != 'production':
+    logger.addHandler(stream_handler)
 
 # Create a logger specific to this module
 logger = logging.getLogger(__name__)
 logger.info(f"Starting Dash application with log level: {LOG_LEVEL}")
 
+# The application modules are imported once logging is configured: importing them
+# initializes the database and loads the graph elements, which log their progress
+from data import ELEMENTS_FILE, ELEMENTS_VERSION
+from layout import get_layout
+from callbacks import register_callbacks
+
 # =============================================================================
 # Dash Application Initialization
 # =============================================================================
@@ -72,6 +85,29 @@ app = dash.Dash(
 # Expose the underlying Flask server for deployment or additional configurations
 server = app.server
 
+@server.after_request
+def cache_elements_bundle(response):
+    """
+    Lets browsers cache the elements bundle when it is requested by its versioned URL.
+
+    The layout references the bundle with its content hash (see layout.py), so a
+    rebuilt bundle gets a new URL and the cached copy never goes stale.
+
+    Parameters:
+        response (flask.Response): The response to the current request.
+
+    Returns:
+        flask.Response: The response, with long-lived caching headers for the bundle.
+    """
+    if (
+        ELEMENTS_VERSION
+        and response.status_code == 200
+        and request.args.get('v') == ELEMENTS_VERSION
+        and request.path == app.get_asset_url(os.path.basename(ELEMENTS_FILE))
+    ):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 # Set the layout of the Dash application by invoking the get_layout function
 app.layout = get_layout()
 
@@ -84,4 +120,4 @@ register_callbacks(app)
 
 if __name__ == '__main__':
     # Run the Dash server in debug mode for development purposes
-    app.run_server(debug=True)
+    app.run(debug=True)
@@ -0,0 +1,184 @@
+/* Clientside callbacks for the Cytoscape graph */
+/* Registered in callbacks.py via ClientsideFunction('graph', <name>) */
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    graph: {
+        /* Zoom Controls */
+        /* Adjusts the graph zoom level without a server round-trip */
+        zoom: function (zoomIn, zoomOut, resetZoom, currentZoom) {
+            var ctx = window.dash_clientside.callback_context;
+            if (!ctx.triggered.length) {
+                return window.dash_clientside.no_update;
+            }
+
+            var triggeredId = ctx.triggered[0].prop_id.split('.')[0];
+            var zoomFactor = 0.2;  // Amount by which to zoom in/out
+            var zoom = (typeof currentZoom === 'number') ? currentZoom : 1.0;
+
+            if (triggeredId === 'zoom-in' && zoomIn) {
+                zoom += zoomFactor;
+            } else if (triggeredId === 'zoom-out' && zoomOut) {
+                zoom -= zoomFactor;
+            } else if (triggeredId === 'reset-zoom' && resetZoom) {
+                zoom = 1.0;  // Reset to default zoom level
+            } else {
+                return window.dash_clientside.no_update;
+            }
+
+            // Ensure zoom level stays within allowed limits (0.5 <= zoom <= 2.0)
+            return Math.max(0.5, Math.min(2.0, zoom));
+        },
+
+        /* Fetch Elements */
+        /* Loads the graph elements from the prebuilt bundle; the URL carries its version */
+        /* If the fetch fails, flags it so the server sends the elements instead */
+        fetchElements: function (url) {
+            var no_update = window.dash_clientside.no_update;
+            if (!url) {
+                return [no_update, no_update];
+            }
+            return fetch(url).then(function (response) {
+                if (!response.ok) {
+                    throw new Error('HTTP ' + response.status);
+                }
+                return response.json();
+            }).then(function (elements) {
+                return [elements, no_update];
+            }).catch(function (err) {
+                console.error('Failed to load the graph elements from ' + url + ':', err);
+                return [no_update, true];
+            });
+        },
+
+        /* Search Index */
+        /* Caches node labels, their element indices and the highlighted labels */
+        /* so the search callback only touches nodes whose highlight changes */
+        indexLabels: function (elements) {
+            var allLabels = [];
+            var labelToIndex = {};
+            var highlighted = [];
+
+            (elements || []).forEach(function (elem, i) {
+                var data = elem.data || {};
+                if ('source' in data) {
+                    return;  // Skip edges
+                }
+                var label = data.label;
+                allLabels.push(label);
+                labelToIndex[label] = i;
+                if ((elem.classes || '').split(' ').indexOf('highlighted') !== -1) {
+                    highlighted.push(label);
+                }
+            });
+
+            return {
+                highlighted: highlighted,
+                all_labels: allLabels,
+                label_to_index: labelToIndex
+            };
+        },
+
+        /* Node Tap */
+        /* Shows the tapped node's information without a server round-trip */
+        nodeTap: function (tappedNodeData) {
+            if (!tappedNodeData) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+
+            var label = tappedNodeData.label || 'No Label';
+            var description = tappedNodeData.description || 'No description available.';
+
+            // HTML content displaying the node information
+            var nodeInfo = {
+                namespace: 'dash_html_components',
+                type: 'Div',
+                props: {
+                    children: [
+                        {namespace: 'dash_html_components', type: 'H4', props: {children: label}},
+                        {namespace: 'dash_html_components', type: 'P', props: {children: description}}
+                    ]
+                }
+            };
+            return nodeInfo;
+        },
+
+        /* Mount Notes Panel */
+        /* Flags the notes panel for mounting on the first node tap */
+        mountPanel: function (tappedNodeData, mounted) {
+            if (!tappedNodeData || mounted) {
+                return window.dash_clientside.no_update;
+            }
+            return true;
+        },
+
+        /* Node Notes */
+        /* Shows the tapped node's notes; also runs when the notes panel is mounted */
+        nodeNotes: function (tappedNodeData) {
+            if (!tappedNodeData) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+
+            // Manage the visibility and content of the notes section
+            var notes = tappedNodeData.notes || '';
+            var renderedNotesStyle = {display: notes.trim() ? 'block' : 'none'};
+            return [notes, renderedNotesStyle, notes, {display: 'block'}];
+        },
+
+        /* Seed State */
+        /* Copies the rendered elements into 'store-graph-state' when it holds none yet */
+        seedState: function (elements, state) {
+            // The graph starts out empty while its elements are being fetched
+            if (!elements || !elements.length || (state && state.elements)) {
+                return window.dash_clientside.no_update;
+            }
+            return Object.assign({}, state, {elements: elements});
+        },
+
+        /* Save State */
+        /* Stores the current graph state in 'store-graph-state', which Dash keeps in localStorage */
+        saveState: function (saveClicks, elements, zoom, pan) {
+            if (!saveClicks || !elements || !elements.length) {
+                // Never overwrite the saved state with a graph that hasn't rendered yet
+                return [window.dash_clientside.no_update, false];
+            }
+            return [{elements: elements, zoom: zoom, pan: pan}, true];
+        },
+
+        /* Load State */
+        /* Restores the graph state saved in 'store-graph-state' */
+        loadState: function (loadClicks, state) {
+            var noUpdate = window.dash_clientside.no_update;
+            if (!loadClicks) {
+                throw window.dash_clientside.PreventUpdate;
+            }
+            if (!state || !state.elements) {
+                return [noUpdate, noUpdate, noUpdate, false];
+            }
+            var zoom = (typeof state.zoom === 'number') ? state.zoom : 1.0;
+            var pan = state.pan || {x: 0, y: 0};
+            return [state.elements, zoom, pan, true];
+        },
+
+        /* Store Note */
+        /* Keeps a saved note in the browser-side graph state, so loading it doesn't drop the note */
+        storeNote: function (saveNoteClicks, noteValue, tappedNodeData, state) {
+            if (!saveNoteClicks || !tappedNodeData || !state || !state.elements) {
+                return window.dash_clientside.no_update;
+            }
+            var nodeId = tappedNodeData.id;
+            var found = false;
+            // Copy only the edited node
+            var elements = state.elements.map(function (elem) {
+                if (found || !elem.data || elem.data.id !== nodeId) {
+                    return elem;
+                }
+                found = true;
+                return Object.assign({}, elem, {data: Object.assign({}, elem.data, {notes: noteValue})});
+            });
+            if (!found) {
+                return window.dash_clientside.no_update;
+            }
+            return Object.assign({}, state, {elements: elements});
+        }
+    }
+});
@@ -0,0 +1,28 @@
+# build_elements.py
+
+# Builds the default Cytoscape graph elements from `data.py` and writes them to
+# `assets/elements.json`. The application writes the bundle itself at startup
+# whenever its content changes; running this at deploy time
+# (`python build_elements.py`) writes it before any worker process starts.
+
+import logging
+from data import ELEMENTS_FILE, build_elements_bundle, write_elements_bundle
+
+# Initialize logger for this module
+logger = logging.getLogger(__name__)
+
+def build_elements():
+    """
+    Builds the graph elements and writes them to ELEMENTS_FILE.
+
+    Returns:
+        int: The number of elements written.
+    """
+    elements, bundle = build_elements_bundle()
+    write_elements_bundle(bundle)
+    logger.info("Wrote %s graph elements to %s.", len(elements), ELEMENTS_FILE)
+    return len(elements)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    build_elements()
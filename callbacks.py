@@ -1,340 +1,407 @@
 # callbacks.py
 
-from dash.dependencies import Input, Output, State
+from dash.dependencies import Input, Output, State, ClientsideFunction
 from dash.exceptions import PreventUpdate
-from dash import callback_context, html
+from dash import no_update
 import logging
-import copy
-from utils.helpers import perform_fuzzy_search, save_graph_state, load_graph_state
+from functools import lru_cache
+from utils.helpers import (
+    search_labels, save_graph_state
+)
+from layout import build_side_panel, get_initial_elements, get_elements_url
 
 # Initialize logger for this module
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=64)
+def _class_set(classes):
+    """
+    Returns the set of classes in a Cytoscape 'classes' string.
+
+    Elements share a handful of distinct class strings (e.g. 'subnode' or
+    'subnode highlighted'), so each string is only parsed once.
+
+    Parameters:
+        classes (str): The space-separated classes of an element.
+
+    Returns:
+        frozenset: The individual class names.
+    """
+    return frozenset(classes.split())
+
+def _with_highlight(elem, highlighted):
+    """
+    Returns the element with the 'highlighted' class added or removed.
+
+    The original element is returned untouched when its classes already match,
+    otherwise a shallow copy carrying the updated 'classes' string is returned.
+
+    Parameters:
+        elem (dict): A Cytoscape element.
+        highlighted (bool): Whether the element should carry the 'highlighted' class.
+
+    Returns:
+        dict: The original or updated element.
+    """
+    classes = elem.get('classes', '')
+    if ('highlighted' in _class_set(classes)) == highlighted:
+        return elem
+    if highlighted:
+        classes = f"{classes} highlighted" if classes else 'highlighted'
+    else:
+        classes = ' '.join(c for c in classes.split() if c != 'highlighted')
+    return {**elem, 'classes': classes}
+
 def register_callbacks(app):
     """
     Registers all callbacks with the Dash app.
 
+    Each interaction has its own callback declaring only the Inputs and States
+    it needs, so e.g. a search never ships the zoom or notes to the server.
+    Outputs shared by several callbacks are declared with `allow_duplicate=True`.
+
     Parameters:
         app (dash.Dash): The Dash application instance.
     """
 
+    # Zoom controls are handled in the browser (see assets/graph.js) to avoid
+    # a server round-trip and the transfer of the graph elements on every click
+    app.clientside_callback(
+        ClientsideFunction(namespace='graph', function_name='zoom'),
+        Output('cytoscape-graph', 'zoom', allow_duplicate=True),
+        [
+            Input('zoom-in', 'n_clicks'),
+            Input('zoom-out', 'n_clicks'),
+            Input('reset-zoom', 'n_clicks')
+        ],
+        State('cytoscape-graph', 'zoom'),
+        prevent_initial_call=True
+    )
+
+    # The layout ships the graph without its elements. How they are filled in is
+    # known at startup: the default elements are fetched from their bundle by the
+    # browser, which caches it across sessions, and handle_initial_elements only
+    # sends them if that fetch fails; any other elements are always sent by
+    # handle_initial_elements
+    if get_elements_url():
+        app.clientside_callback(
+            ClientsideFunction(namespace='graph', function_name='fetchElements'),
+            [
+                Output('cytoscape-graph', 'elements', allow_duplicate=True),
+                Output('elements-fetch-failed', 'data')
+            ],
+            Input('elements-url', 'data'),
+            prevent_initial_call='initial_duplicate'
+        )
+        elements_trigger = Input('elements-fetch-failed', 'data')
+        elements_initial_call = True
+    else:
+        elements_trigger = Input('elements-url', 'data')
+        elements_initial_call = 'initial_duplicate'
+
     @app.callback(
+        Output('cytoscape-graph', 'elements', allow_duplicate=True),
+        elements_trigger,
+        prevent_initial_call=elements_initial_call
+    )
+    def handle_initial_elements(trigger):
+        """
+        Sends the graph elements the page starts with, once per page load.
+
+        Runs on page load if there is no bundle to fetch the elements from, or
+        once the browser has flagged that fetching the bundle failed.
+
+        Parameters:
+            trigger: The URL of the elements bundle (None), or the fetch failure flag.
+
+        Returns:
+            list: The saved or default graph elements (loaded once and cached).
+        """
+        if trigger is False:
+            raise PreventUpdate
+        return get_initial_elements()
+
+    # Node details are rendered in the browser (see assets/graph.js); the tapped
+    # node's data is already available clientside
+    app.clientside_callback(
+        ClientsideFunction(namespace='graph', function_name='nodeTap'),
+        Output('node-info', 'children', allow_duplicate=True),
+        Input('cytoscape-graph', 'tapNodeData'),
+        prevent_initial_call=True
+    )
+
+    # The notes panel is mounted on the first node tap only
+    app.clientside_callback(
+        ClientsideFunction(namespace='graph', function_name='mountPanel'),
+        Output('panel-mounted', 'data'),
+        Input('cytoscape-graph', 'tapNodeData'),
+        State('panel-mounted', 'data'),
+        prevent_initial_call=True
+    )
+
+    # 'initial_duplicate' lets Dash run this callback when its outputs are mounted,
+    # so the notes of the node tapped first are shown as soon as the panel appears;
+    # updates for a panel that isn't mounted yet are ignored by Dash
+    app.clientside_callback(
+        ClientsideFunction(namespace='graph', function_name='nodeNotes'),
+        [
+            Output('rendered-notes', 'children', allow_duplicate=True),
+            Output('rendered-notes-section', 'style', allow_duplicate=True),
+            Output('node-notes', 'value', allow_duplicate=True),
+            Output('notes-section', 'style', allow_duplicate=True)
+        ],
+        Input('cytoscape-graph', 'tapNodeData'),
+        prevent_initial_call='initial_duplicate'
+    )
+
+    @app.callback(
+        Output('side-panel-slot', 'children'),
+        Input('panel-mounted', 'data'),
+        prevent_initial_call=True
+    )
+    def handle_side_panel(mounted):
+        """
+        Mounts the notes panel once a node has been tapped.
+
+        Returns:
+            list: The notes panel components.
+        """
+        if not mounted:
+            raise PreventUpdate
+        logger.debug("Mounting the notes panel.")
+        return build_side_panel()
+
+    # Rebuild the search index whenever the graph elements change
+    app.clientside_callback(
+        ClientsideFunction(namespace='graph', function_name='indexLabels'),
+        Output('search-highlight-cache', 'data'),
+        Input('cytoscape-graph', 'elements')
+    )
+
+    # Saving and loading the graph state happens in the browser (see assets/graph.js):
+    # the state is kept in the 'store-graph-state' Store, which Dash persists in
+    # localStorage, so neither path needs a server round-trip
+    # The layout ships the Store without the elements; they are copied in from
+    # the rendered graph unless the browser already holds a saved state
+    app.clientside_callback(
+        ClientsideFunction(namespace='graph', function_name='seedState'),
+        Output('store-graph-state', 'data', allow_duplicate=True),
+        Input('cytoscape-graph', 'elements'),
+        State('store-graph-state', 'data'),
+        prevent_initial_call='initial_duplicate'
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='graph', function_name='saveState'),
+        [
+            Output('store-graph-state', 'data', allow_duplicate=True),
+            Output('save-alert', 'is_open')
+        ],
+        Input('save-state', 'n_clicks'),
         [
-            Output('cytoscape-graph', 'elements'),
-            Output('cytoscape-graph', 'zoom'),
+            State('cytoscape-graph', 'elements'),
+            State('cytoscape-graph', 'zoom'),
+            State('cytoscape-graph', 'pan')
+        ],
+        prevent_initial_call=True
+    )
+
+    app.clientside_callback(
+        ClientsideFunction(namespace='graph', function_name='loadState'),
+        [
+            Output('cytoscape-graph', 'elements', allow_duplicate=True),
+            Output('cytoscape-graph', 'zoom', allow_duplicate=True),
             Output('cytoscape-graph', 'pan'),
-            Output('node-info', 'children'),
-            Output('rendered-notes', 'children'),
-            Output('rendered-notes-section', 'style'),
-            Output('node-notes', 'value'),
-            Output('notes-section', 'style'),
-            Output('save-alert', 'is_open'),
-            Output('load-alert', 'is_open'),
-            Output('note-save-alert', 'is_open')
+            Output('load-alert', 'is_open')
         ],
+        Input('load-state', 'n_clicks'),
+        State('store-graph-state', 'data'),
+        prevent_initial_call=True
+    )
+
+    # Saved notes are also written into the browser-side state
+    app.clientside_callback(
+        ClientsideFunction(namespace='graph', function_name='storeNote'),
+        Output('store-graph-state', 'data', allow_duplicate=True),
+        Input('save-note', 'n_clicks'),
         [
-            Input('zoom-in', 'n_clicks'),
-            Input('zoom-out', 'n_clicks'),
-            Input('reset-zoom', 'n_clicks'),
-            Input('load-state', 'n_clicks'),
-            Input('save-state', 'n_clicks'),
-            Input('save-note', 'n_clicks'),
-            Input('node-search', 'value'),
-            Input('cytoscape-graph', 'tapNodeData')
+            State('node-notes', 'value'),
+            State('cytoscape-graph', 'tapNodeData'),
+            State('store-graph-state', 'data')
         ],
+        prevent_initial_call=True
+    )
+
+    @app.callback(
+        Output('export-alert', 'is_open'),
+        Input('export-state', 'n_clicks'),
         [
             State('cytoscape-graph', 'elements'),
             State('cytoscape-graph', 'zoom'),
-            State('cytoscape-graph', 'pan'),
+            State('cytoscape-graph', 'pan')
+        ],
+        prevent_initial_call=True
+    )
+    def handle_export_state(export_clicks, current_elements, current_zoom, current_pan):
+        """
+        Exports the current graph state to the database.
+
+        Returns:
+            bool: Whether to open the export alert, i.e. whether the state was saved.
+        """
+        if not export_clicks:
+            raise PreventUpdate
+
+        if not current_elements:
+            # Never overwrite the saved state with a graph that hasn't rendered yet
+            logger.warning("Export State clicked before the graph elements were available.")
+            return False
+
+        logger.info("Export State button clicked. Saving graph state to database.")
+        state_to_save = {
+            'elements': current_elements,
+            'zoom': current_zoom,
+            'pan': current_pan
+        }
+        success = save_graph_state(state_to_save)
+        if success:
+            logger.info("Graph state exported successfully.")
+        else:
+            logger.error("Failed to export graph state.")
+        return success
+
+    @app.callback(
+        [
+            Output('cytoscape-graph', 'elements', allow_duplicate=True),
+            Output('rendered-notes', 'children', allow_duplicate=True),
+            Output('rendered-notes-section', 'style', allow_duplicate=True),
+            Output('node-notes', 'value', allow_duplicate=True),
+            Output('notes-section', 'style', allow_duplicate=True),
+            Output('note-save-alert', 'is_open')
+        ],
+        Input('save-note', 'n_clicks'),
+        [
+            State('cytoscape-graph', 'elements'),
             State('node-notes', 'value'),
             State('cytoscape-graph', 'tapNodeData')
-        ]
+        ],
+        prevent_initial_call=True
     )
-    def handle_interactions(
-        zoom_in, zoom_out, reset_zoom, load_clicks, save_clicks, save_note_clicks,
-        search_value, tapped_node_data,
-        current_elements, current_zoom, current_pan, note_value, tapped_node_state
-    ):
+    def handle_note_save(save_note_clicks, current_elements, note_value, tapped_node_state):
         """
-        Handles zoom controls, loading/saving state, searching nodes, node taps, and saving notes.
+        Saves the edited notes on the selected node.
+
+        The note is kept in the graph elements and, by graph.storeNote, in the
+        browser-side saved state; it reaches the database with the next export.
 
         Returns:
-            list: Updated elements, zoom, pan, node info, rendered notes, styles, and alert states.
+            tuple: Updated elements, rendered notes, styles, and the note alert state.
         """
-        ctx = callback_context
+        if not save_note_clicks:
+            raise PreventUpdate
 
-        if not ctx.triggered:
-            # No action triggered; do not update
+        if not tapped_node_state:
+            logger.warning("Save Note clicked without selecting a node.")
             raise PreventUpdate
 
-        # Identify which input triggered the callback
-        triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
-        logger.info(f"Combined Callback triggered by: {triggered_id}")
-
-        # Initialize default outputs
-        new_elements = copy.deepcopy(current_elements)
-        new_zoom = current_zoom
-        new_pan = current_pan
-        node_info = "Click on a node to see details."
-        rendered_notes = ''
-        rendered_notes_style = {'display': 'none'}
-        node_notes_value = ''
-        notes_section_style = {'display': 'none'}
-        save_alert = False
-        load_alert = False
-        note_save_alert = False
-
-        ### Handling Zoom Controls ###
-        if triggered_id in ['zoom-in', 'zoom-out', 'reset-zoom']:
-            logger.info(f"Handling zoom action triggered by: {triggered_id}")
-
-            zoom_factor = 0.2  # Define the amount by which to zoom in/out
-
-            if triggered_id == 'zoom-in' and zoom_in:
-                new_zoom += zoom_factor
-                logger.debug(f"Zooming in: New Zoom Level = {new_zoom}")
-            elif triggered_id == 'zoom-out' and zoom_out:
-                new_zoom -= zoom_factor
-                logger.debug(f"Zooming out: New Zoom Level = {new_zoom}")
-            elif triggered_id == 'reset-zoom' and reset_zoom:
-                new_zoom = 1.0  # Reset to default zoom level
-                logger.debug("Resetting zoom to default level.")
-
-            # Ensure zoom level stays within allowed limits
-            new_zoom = max(0.5, min(new_zoom, 2.0))  # Example limits: 0.5 <= zoom <= 2.0
-            logger.debug(f"Adjusted Zoom Level: {new_zoom}")
-
-            return (
-                new_elements,
-                new_zoom,
-                new_pan,
-                node_info,
-                rendered_notes,
-                rendered_notes_style,
-                node_notes_value,
-                notes_section_style,
-                save_alert,
-                load_alert,
-                note_save_alert
-            )
-
-        ### Handling Load State ###
-        elif triggered_id == 'load-state' and load_clicks:
-            logger.info("Load State button clicked. Loading graph state from database.")
-            state = load_graph_state()
-            if state:
-                new_elements = state.get('elements', current_elements)
-                new_zoom = state.get('zoom', 1.0)
-                new_pan = state.get('pan', {'x': 0, 'y': 0})
-                logger.debug(f"Loaded state - Zoom: {new_zoom}, Pan: {new_pan}")
-
-                # Log node positions for debugging
-                for elem in new_elements:
-                    if 'source' not in elem['data'] and 'target' not in elem['data']:
-                        position = elem.get('position', {'x': 0, 'y': 0})
-                        logger.debug(f"Node ID: {elem['data']['id']}, Position: {position}")
-
-                load_alert = True  # Open load alert
-                logger.info("Graph state loaded successfully.")
-            else:
-                logger.warning("No state to load.")
-                load_alert = False
-
-            return (
-                new_elements,
-                new_zoom,
-                new_pan,
-                node_info,
-                rendered_notes,
-                rendered_notes_style,
-                node_notes_value,
-                notes_section_style,
-                save_alert,
-                load_alert,
-                note_save_alert
-            )
-
-        ### Handling Save State ###
-        elif triggered_id == 'save-state' and save_clicks:
-            logger.info("Save State button clicked. Saving graph state to database.")
-            state_to_save = {
-                'elements': new_elements,
-                'zoom': new_zoom,
-                'pan': new_pan
-            }
-            success = save_graph_state(state_to_save)
-            if success:
-                save_alert = True  # Open save alert
-                logger.info("Graph state saved successfully.")
+        if current_elements is None:
+            # Elements not rendered yet (initial render race)
+            current_elements = []
+
+        node_id = tapped_node_state.get('id')
+        new_elements = no_update
+        # Update the note in the elements, copying only the affected node
+        for i, elem in enumerate(current_elements):
+            if elem['data'].get('id') == node_id:
+                updated_elem = {**elem, 'data': {**elem['data'], 'notes': note_value}}
+                new_elements = current_elements[:i] + [updated_elem] + current_elements[i + 1:]
+                logger.info("Note saved for node %s.", node_id)
+                break
+        else:
+            logger.warning("Node with ID %s not found in elements.", node_id)
+
+        # Update the rendered notes
+        rendered_notes_style = {'display': 'block'} if note_value.strip() else {'display': 'none'}
+        return new_elements, note_value, rendered_notes_style, note_value, {'display': 'block'}, True
+
+    @app.callback(
+        [
+            Output('cytoscape-graph', 'elements', allow_duplicate=True),
+            Output('node-info', 'children', allow_duplicate=True),
+            Output('last-search', 'data')
+        ],
+        Input('node-search', 'value'),
+        [
+            State('cytoscape-graph', 'elements'),
+            State('search-highlight-cache', 'data'),
+            State('last-search', 'data')
+        ],
+        prevent_initial_call=True
+    )
+    def handle_search(search_value, current_elements, search_cache, last_search):
+        """
+        Highlights the nodes whose labels match the search query.
+
+        Returns:
+            tuple: Updated elements (or `dash.no_update`), the node info message,
+                   and the processed search query.
+        """
+        if search_value == last_search:
+            # Same query as the last processed one; highlights are already up to date
+            raise PreventUpdate
+
+        if current_elements is None:
+            # Elements not rendered yet (initial render race)
+            current_elements = []
+
+        new_elements = no_update
+        try:
+            if search_cache and 'label_to_index' in search_cache:
+                all_labels = search_cache['all_labels']
+                label_to_index = search_cache['label_to_index']
+                prev_matches = set(search_cache['highlighted'])
             else:
-                logger.error("Failed to save graph state.")
-                save_alert = False
-
-            return (
-                new_elements,
-                new_zoom,
-                new_pan,
-                node_info,
-                rendered_notes,
-                rendered_notes_style,
-                node_notes_value,
-                notes_section_style,
-                save_alert,
-                load_alert,
-                note_save_alert
-            )
-
-        ### Handling Save Note ###
-        elif triggered_id == 'save-note' and save_note_clicks:
-            if tapped_node_state:
-                node_id = tapped_node_state.get('id')
-                # Update the note in the elements
-                for elem in new_elements:
-                    if elem['data'].get('id') == node_id:
-                        elem['data']['notes'] = note_value  # Update the notes
-                        logger.info(f"Note saved for node {node_id}.")
-                        break
-                else:
-                    logger.warning(f"Node with ID {node_id} not found in elements.")
-                note_save_alert = True
-                # Update the rendered notes
-                rendered_notes = note_value
-                rendered_notes_style = {'display': 'block'} if note_value.strip() else {'display': 'none'}
-                node_notes_value = note_value
-                notes_section_style = {'display': 'block'}
-
-                # Optionally, save the updated state
-                state_to_save = {
-                    'elements': new_elements,
-                    'zoom': new_zoom,
-                    'pan': new_pan
-                }
-                save_graph_state(state_to_save)
+                # Index not built yet; derive it from the current graph elements
+                all_labels = []
+                label_to_index = {}
+                prev_matches = set()
+                for i, elem in enumerate(current_elements):
+                    if 'source' in elem['data']:
+                        continue  # Skip edges
+                    label = elem['data']['label']
+                    all_labels.append(label)
+                    label_to_index[label] = i
+                    if 'highlighted' in _class_set(elem.get('classes', '')):
+                        prev_matches.add(label)
+
+            matching_labels = ()
+            if not search_value:
+                logger.info("Empty search query: All nodes are visible.")
+                node_info = "Search cleared. All nodes are visible."
             else:
-                logger.warning("Save Note clicked without selecting a node.")
-
-            return (
-                new_elements,
-                new_zoom,
-                new_pan,
-                node_info,
-                rendered_notes,
-                rendered_notes_style,
-                node_notes_value,
-                notes_section_style,
-                save_alert,
-                load_alert,
-                note_save_alert
-            )
-
-        ### Handling Search ###
-        elif triggered_id == 'node-search':
-            # Ensure that classes are updated for all nodes based on the current search
-            try:
-                # Remove 'highlighted' class from all nodes
-                for elem in new_elements:
-                    if 'classes' in elem:
-                        classes = elem['classes'].split()
-                        if 'highlighted' in classes:
-                            classes.remove('highlighted')
-                        elem['classes'] = ' '.join(classes)
-                if not search_value:
-                    logger.info("Empty search query: All nodes are visible.")
-                    node_info = "Search cleared. All nodes are visible."
+                # Perform substring search to find matching labels using the cached
+                # suffix index (precomputed for the default labels in data.py);
+                # repeated queries over the same labels are answered from a cache
+                matching_labels = search_labels(search_value, tuple(all_labels))
+                logger.info("Search query: '%s' | Matches: %s", search_value, matching_labels)
+
+                if not matching_labels:
+                    logger.info("No matching nodes found for the search query.")
+                    node_info = "No matching nodes found."
                 else:
-                    # Extract all node labels from the current graph elements
-                    all_labels = [
-                        elem['data']['label'] for elem in current_elements
-                        if 'source' not in elem['data'] and 'target' not in elem['data']
-                    ]
-                    # Perform substring search to find matching labels
-                    matching_labels = perform_fuzzy_search(search_value, all_labels)
-                    logger.info(f"Search query: '{search_value}' | Matches: {matching_labels}")
-
-                    if not matching_labels:
-                        logger.info("No matching nodes found for the search query.")
-                        node_info = "No matching nodes found."
-                    else:
-                        # Update 'classes' for each node based on whether it matches
-                        for elem in new_elements:
-                            if 'source' in elem['data'] and 'target' in elem['data']:
-                                continue  # Skip edges
-                            label = elem['data'].get('label', '')
-                            if label in matching_labels:
-                                # Add 'highlighted' class if not already present
-                                classes = elem.get('classes', '').split()
-                                if 'highlighted' not in classes:
-                                    classes.append('highlighted')
-                                elem['classes'] = ' '.join(classes)
-                            else:
-                                # Ensure 'highlighted' class is not present
-                                classes = elem.get('classes', '').split()
-                                if 'highlighted' in classes:
-                                    classes.remove('highlighted')
-                                elem['classes'] = ' '.join(classes)
-                        node_info = "Matching nodes highlighted."
-
-            except Exception as e:
-                logger.error(f"Error during search callback: {e}")
-                node_info = "An error occurred during the search."
-
-            return (
-                new_elements,
-                new_zoom,
-                new_pan,
-                node_info,
-                rendered_notes,
-                rendered_notes_style,
-                node_notes_value,
-                notes_section_style,
-                save_alert,
-                load_alert,
-                note_save_alert
-            )
-
-        ### Handling Node Tap ###
-        elif triggered_id == 'cytoscape-graph':
-            if tapped_node_data:
-                try:
-                    # Extract relevant data from the tapped node
-                    label = tapped_node_data.get('label', 'No Label')
-                    description = tapped_node_data.get('description', 'No description available.')
-                    notes = tapped_node_data.get('notes', '')
-                    logger.info(f"Node tapped: {label}")
-
-                    # Create HTML content to display node information
-                    node_info = html.Div([
-                        html.H4(f"{label}"),
-                        html.P(f"{description}")
-                    ])
-
-                    # Manage the visibility and content of the notes section
-                    rendered_notes = notes
-                    rendered_notes_style = {'display': 'block'} if notes.strip() else {'display': 'none'}
-                    node_notes_value = notes
-                    notes_section_style = {'display': 'block'}
-
-                except Exception as e:
-                    logger.error(f"Error during node tap callback: {e}")
-                    node_info = "An error occurred while processing the node tap."
-                    rendered_notes = ''
-                    rendered_notes_style = {'display': 'none'}
-                    node_notes_value = ''
-                    notes_section_style = {'display': 'none'}
-
-            return (
-                new_elements,
-                new_zoom,
-                new_pan,
-                node_info,
-                rendered_notes,
-                rendered_notes_style,
-                node_notes_value,
-                notes_section_style,
-                save_alert,
-                load_alert,
-                note_save_alert
-            )
-
-        # If the trigger doesn't match expected inputs, prevent update
-        raise PreventUpdate
+                    node_info = "Matching nodes highlighted."
+
+            # Only nodes entering or leaving the match set need their classes updated
+            curr_matches = set(matching_labels)
+            changed_labels = prev_matches ^ curr_matches
+            if changed_labels:
+                new_elements = list(current_elements)
+                for label in changed_labels:
+                    i = label_to_index[label]
+                    new_elements[i] = _with_highlight(new_elements[i], label in curr_matches)
+
+        except Exception as e:
+            logger.error("Error during search callback: %s", e)
+            node_info = "An error occurred during the search."
+
+        return new_elements, node_info, search_value
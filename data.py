@@ -4,6 +4,16 @@
 # graph within the Dash application. It categorizes various Azure services under
 # primary nodes and their respective subnodes for visualization and interaction.
 
+import os
+import hashlib
+import logging
+import tempfile
+import orjson
+from utils.helpers import load_graph_elements, build_label_index, is_edge
+
+# Initialize logger for this module
+logger = logging.getLogger(__name__)
+
 # =============================================================================
 # Central Node Definition
 # =============================================================================
@@ -77,3 +87,93 @@ subnodes = {
         'Blueprints': 'Azure Blueprints automate governance for resource management and compliance.'
     }
 }
+
+# =============================================================================
+# Precomputed Graph Elements and Search Index
+# =============================================================================
+
+# Elements bundle the browser fetches the default elements from; written at
+# startup whenever its content changes (see load_elements)
+ELEMENTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets', 'elements.json')
+
+def build_elements_bundle():
+    """
+    Builds the default graph elements and serializes them for the bundle.
+
+    Returns:
+        tuple: A list of nodes and edges for the Cytoscape graph, and the same
+               list serialized with `orjson`.
+    """
+    elements = load_graph_elements(central_node, primary_nodes, subnodes)
+    return elements, orjson.dumps(elements)
+
+def write_elements_bundle(bundle):
+    """
+    Writes the serialized elements to ELEMENTS_FILE atomically.
+
+    The bundle is written to a temporary file next to ELEMENTS_FILE and moved
+    into place with `os.replace`, so other workers starting up and in-flight
+    browser fetches read either the old or the new bundle, never a truncated one.
+
+    Parameters:
+        bundle (bytes): The serialized graph elements.
+
+    Raises:
+        OSError: If the bundle cannot be written.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(ELEMENTS_FILE), prefix='.elements-', suffix='.tmp'
+    )
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(bundle)
+        # mkstemp creates the file readable by its owner only; assets are public
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, ELEMENTS_FILE)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def load_elements():
+    """
+    Returns the default graph elements.
+
+    The elements are built from the data structures above and compared with the
+    bundle at ELEMENTS_FILE. If the bundle is missing or out of date (the data
+    was edited since it was written), it is written again, so browsers never
+    fetch stale elements.
+
+    Returns:
+        tuple: A list of nodes and edges for the Cytoscape graph, and the content
+               hash of the bundle serving them (None if the bundle cannot be
+               written, and the elements are sent by a callback).
+    """
+    elements, bundle = build_elements_bundle()
+    try:
+        with open(ELEMENTS_FILE, 'rb') as f:
+            current = f.read()
+    except FileNotFoundError:
+        current = None
+    except OSError as e:
+        logger.warning("Could not read the elements bundle at %s: %s", ELEMENTS_FILE, e)
+        current = None
+
+    if current != bundle:
+        try:
+            write_elements_bundle(bundle)
+        except OSError as e:
+            logger.warning("Could not write the elements bundle to %s: %s", ELEMENTS_FILE, e)
+            return elements, None
+        logger.info("Wrote %s graph elements to %s.", len(elements), ELEMENTS_FILE)
+
+    logger.info("Serving %s graph elements from %s.", len(elements), ELEMENTS_FILE)
+    return elements, hashlib.sha256(bundle).hexdigest()[:16]
+
+# Default graph elements, loaded once at import instead of on every layout call;
+# ELEMENTS_VERSION identifies the bundle serving them, so its URL changes with it
+ELEMENTS, ELEMENTS_VERSION = load_elements()
+
+# Warm the cache of the suffix index for the default node labels, so the first
+# search doesn't have to build it; search_labels() looks the index up by the same
+# labels tuple, which the search callback derives from the elements in this order
+build_label_index(tuple(elem['data']['label'] for elem in ELEMENTS if not is_edge(elem)))
@@ -1,28 +1,135 @@
 # layout.py
 
 import dash_bootstrap_components as dbc
-from dash import html, dcc
+from dash import html, dcc, get_asset_url
 from components.graph import GraphComponent
-from data import central_node, primary_nodes, subnodes
-from utils.helpers import load_graph_elements, load_graph_state
+from data import ELEMENTS, ELEMENTS_FILE, ELEMENTS_VERSION
+from utils.helpers import load_graph_state, is_edge
+from functools import lru_cache
+import json
 import logging
+import os
 
 # Initialize logger for this module
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=1)
 def load_initial_graph_state():
     """
     Loads the initial graph state from the database.
 
+    The state is loaded once per process: the layout, the initial elements and
+    the choice of initial elements callback (see callbacks.py) all start from
+    the state saved when the server started.
+
     Returns:
         dict or None: The saved graph state if available, else None.
     """
     return load_graph_state()
 
+@lru_cache(maxsize=1)
+def get_elements_url():
+    """
+    Returns the URL the browser fetches the initial graph elements from.
+
+    The default elements loaded from the prebuilt bundle are fetched by the
+    browser itself (see assets/graph.js); the version in the URL lets the
+    bundle be cached for good.
+
+    Returns:
+        str or None: The versioned URL of the elements bundle, or None if there is a
+                     saved state or no bundle, and the elements are sent by a callback.
+    """
+    if not ELEMENTS_VERSION or load_initial_graph_state():
+        return None
+    return f"{get_asset_url(os.path.basename(ELEMENTS_FILE))}?v={ELEMENTS_VERSION}"
+
+@lru_cache(maxsize=1)
+def get_initial_elements():
+    """
+    Returns the graph elements the page starts with.
+
+    The layout ships the graph without its elements; unless they are fetched
+    from the prebuilt bundle, the initial elements callback (see callbacks.py)
+    sends them once the page has loaded. They are loaded once and reused for
+    every client, like the layout itself.
+
+    Returns:
+        list: The saved graph elements if available, else the defaults from `data.py`.
+    """
+    initial_state = load_initial_graph_state()
+    elements = initial_state.get('elements', []) if initial_state else ELEMENTS
+
+    # Log details of loaded elements for debugging purposes
+    if logger.isEnabledFor(logging.DEBUG):
+        debug = logger.debug
+        for elem in elements:
+            # Identify node elements by their precomputed edge flag
+            if not is_edge(elem):
+                data = elem['data']
+                debug(
+                    "Loaded Node ID: %s, Color: %s, Classes: %s",
+                    data['id'],
+                    data.get('color', 'No color specified'),
+                    elem.get('classes', 'No classes specified')
+                )
+    return elements
+
+@lru_cache(maxsize=1)
+def build_side_panel():
+    """
+    Builds the notes panel shown below the node information.
+
+    The panel is not part of the initial layout; it is mounted into
+    'side-panel-slot' on the first node tap, so the Markdown and Textarea
+    components aren't rendered at page load. The children are built once
+    and reused.
+
+    Returns:
+        list: The rendered notes and notes editing sections.
+    """
+    return [
+        # Rendered Notes Display (Initially Hidden)
+        html.Div(
+            id='rendered-notes-section',
+            children=[
+                html.H5("Notes:"),
+                dcc.Markdown(
+                    id='rendered-notes',
+                    children=''  # Will be populated dynamically
+                )
+            ],
+            style={'display': 'none'}  # Hidden until notes are present
+        ),
+        # Notes Editing Section (Initially Hidden)
+        html.Div(
+            id='notes-section',
+            children=[
+                html.H5("Add or Edit Notes:"),
+                dcc.Textarea(
+                    id='node-notes',
+                    value='',  # Initial notes value is empty
+                    style={'width': '100%', 'height': '100px'}  # Full-width textarea
+                ),
+                dbc.Button(
+                    "Save Note",
+                    id='save-note',
+                    color='primary',  # Bootstrap primary color
+                    className='mt-2 w-100'  # Top margin and full-width
+                )
+            ],
+            style={'display': 'none'}  # Hidden until a node is selected
+        )
+    ]
+
 def get_layout():
     """
     Constructs and returns the layout for the Dash application.
 
+    The component tree only depends on the zoom, the pan and where the graph
+    elements are loaded from, so it is built once per distinct combination. The
+    elements themselves are not part of the layout (see get_initial_elements).
+
     Returns:
         dbc.Container: The Dash layout container with all UI components.
     """
@@ -30,42 +137,87 @@ def get_layout():
     initial_state = load_initial_graph_state()
 
     if initial_state:
-        # If a saved state exists, extract elements, zoom, and pan
-        elements = initial_state.get('elements', [])
-        zoom = initial_state.get('zoom', 1.0)
-        pan = initial_state.get('pan', {'x': 0, 'y': 0})
+        # If a saved state exists, extract zoom and pan; its elements are sent
+        # by the initial elements callback
+        state = {
+            'zoom': initial_state.get('zoom', 1.0),
+            'pan': initial_state.get('pan', {'x': 0, 'y': 0})
+        }
     else:
-        # If no saved state, initialize with default data from `data.py`
-        elements = load_graph_elements(central_node, primary_nodes, subnodes)
-        zoom = 1.0  # Default zoom level
-        pan = {'x': 0, 'y': 0}  # Default pan position
+        # If no saved state, initialize with the defaults
+        state = {
+            'zoom': 1.0,              # Default zoom level
+            'pan': {'x': 0, 'y': 0}   # Default pan position
+        }
+    state['elements_url'] = get_elements_url()
 
-    # Log details of loaded elements for debugging purposes
-    for elem in elements:
-        # Identify node elements by absence of 'source' and 'target' (edge identifiers)
-        if 'source' not in elem['data'] and 'target' not in elem['data']:
-            node_id = elem['data']['id']
-            color = elem['data'].get('color', 'No color specified')
-            classes = elem.get('classes', 'No classes specified')
-            logger.debug(f"Loaded Node ID: {node_id}, Color: {color}, Classes: {classes}")
+    return _build_layout(json.dumps(state, sort_keys=True))
+
+@lru_cache(maxsize=8)
+def _build_layout(state_key):
+    """
+    Builds the layout for a serialized graph state.
+
+    Parameters:
+        state_key (str): The zoom, the pan and the URL of the elements bundle (None
+                         if the elements are sent by a callback) serialized as JSON
+                         with sorted keys.
+
+    Returns:
+        dbc.Container: The Dash layout container with all UI components.
+    """
+    state = json.loads(state_key)
+    zoom = state['zoom']
+    pan = state['pan']
+    elements_url = state['elements_url']
 
     return dbc.Container([
         # =============================================================================
         # Data Storage Components
         # =============================================================================
 
-        # Store to keep original graph elements for reference or reset purposes
+        # Store to maintain the saved graph state, including zoom and pan
+        # Uses local storage to persist state across browser sessions; written by
+        # "Save State" and read by "Load State" entirely in the browser.
+        # The elements are left out here, as the graph already carries them;
+        # they are copied in clientside once the graph has rendered
         dcc.Store(
-            id='original-elements',
-            data=elements  # Initialize with loaded or default graph elements
+            id='store-graph-state',
+            data={'zoom': zoom, 'pan': pan},
+            storage_type='local'
         ),
 
-        # Store to maintain the current graph state, including zoom and pan
-        # Uses local storage to persist state across browser sessions
+        # Store holding the URL of the elements bundle the browser loads the graph
+        # elements from, or None if they are sent by the initial elements callback
         dcc.Store(
-            id='store-graph-state',
-            data={'elements': elements, 'zoom': zoom, 'pan': pan},
-            storage_type='local'
+            id='elements-url',
+            data=elements_url
+        ),
+
+        # Store flagging that the browser failed to fetch the elements bundle, so
+        # the initial elements callback sends the elements instead
+        dcc.Store(
+            id='elements-fetch-failed',
+            data=False
+        ),
+
+        # Store caching node labels, their element indices and the currently
+        # highlighted labels; kept in sync with the graph elements clientside
+        dcc.Store(
+            id='search-highlight-cache',
+            data={'highlighted': []}
+        ),
+
+        # Store holding the last processed search query, so repeated values are skipped
+        dcc.Store(
+            id='last-search',
+            data=''
+        ),
+
+        # Store flagging whether the notes panel has been mounted (on the first node tap)
+        dcc.Store(
+            id='panel-mounted',
+            data=False
         ),
 
         # =============================================================================
@@ -88,7 +240,7 @@ def get_layout():
             # -----------------------------------------------------------------------------
             dbc.Col(
                 GraphComponent(
-                    elements=elements,  # Pass the graph elements to render
+                    elements=[],        # Filled in once the page has loaded
                     zoom=zoom,          # Set the initial zoom level
                     pan=pan             # Set the initial pan position
                 ),
@@ -108,6 +260,7 @@ def get_layout():
                         type='text',
                         placeholder='Search nodes...',  # Placeholder guiding the user
                         value='',                        # Initial value is empty
+                        debounce=150,                    # Only search once typing pauses for 150 ms
                         className='mb-3'                 # Bottom margin for spacing
                     ),
 
@@ -135,8 +288,9 @@ def get_layout():
                     ),
 
                     # -----------------------------------------------------------------------------
-                    # 3. Save and Load State Controls
-                    # Buttons to save the current graph state or load a saved state
+                    # 3. Save, Load and Export State Controls
+                    # Buttons to save the current graph state in the browser, load it back,
+                    # or export it to the server-side database
                     # -----------------------------------------------------------------------------
                     dbc.Button(
                         "Save State",
@@ -148,6 +302,12 @@ def get_layout():
                         "Load State",
                         id="load-state",
                         color="info",     # Bootstrap info color (usually light blue)
+                        className="mb-2 w-100"
+                    ),
+                    dbc.Button(
+                        "Export State",
+                        id="export-state",
+                        color="secondary",
                         className="mb-4 w-100"
                     ),
 
@@ -163,37 +323,9 @@ def get_layout():
                                 children="Click on a node to see details.",
                                 style={'minHeight': '50px'}  # Ensures space allocation
                             ),
-                            # Rendered Notes Display (Initially Hidden)
-                            html.Div(
-                                id='rendered-notes-section',
-                                children=[
-                                    html.H5("Notes:"),
-                                    dcc.Markdown(
-                                        id='rendered-notes',
-                                        children=''  # Will be populated dynamically
-                                    )
-                                ],
-                                style={'display': 'none'}  # Hidden until notes are present
-                            ),
-                            # Notes Editing Section (Initially Hidden)
-                            html.Div(
-                                id='notes-section',
-                                children=[
-                                    html.H5("Add or Edit Notes:"),
-                                    dcc.Textarea(
-                                        id='node-notes',
-                                        value='',  # Initial notes value is empty
-                                        style={'width': '100%', 'height': '100px'}  # Full-width textarea
-                                    ),
-                                    dbc.Button(
-                                        "Save Note",
-                                        id='save-note',
-                                        color='primary',  # Bootstrap primary color
-                                        className='mt-2 w-100'  # Top margin and full-width
-                                    )
-                                ],
-                                style={'display': 'none'}  # Hidden until a node is selected
-                            )
+                            # Notes display and editing, mounted on the first node tap
+                            # (see build_side_panel)
+                            html.Div(id='side-panel-slot')
                         ])
                     ),
 
@@ -215,6 +347,13 @@ def get_layout():
                         color='info',
                         children="Graph state loaded!"
                     ),
+                    dbc.Alert(
+                        id='export-alert',
+                        is_open=False,
+                        duration=4000,
+                        color='success',
+                        children="Graph state exported to the database!"
+                    ),
                     dbc.Alert(
                         id='note-save-alert',
                         is_open=False,
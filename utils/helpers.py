@@ -3,10 +3,15 @@
 import math
 # from rapidfuzz import process, fuzz
 import os
-import json
+import orjson
 import logging
 import sqlite3
+import threading
+import zlib
+from bisect import bisect_left
 from contextlib import contextmanager
+from functools import lru_cache
+from sys import intern
 
 # Initialize logger for this module
 logger = logging.getLogger(__name__)
@@ -16,7 +21,7 @@ logger = logging.getLogger(__name__)
 # =============================================================================
 
 # Define a color palette for primary nodes
-PRIMARY_NODE_COLORS = [
+PRIMARY_NODE_COLORS = (
     '#1f77b4',  # Blue
     '#ff7f0e',  # Orange
     '#2ca02c',  # Green
@@ -27,138 +32,212 @@ PRIMARY_NODE_COLORS = [
     '#7f7f7f',  # Gray
     '#bcbd22',  # Olive
     '#17becf'   # Cyan
+)
+
+# Number of palette colors; primary nodes beyond it reuse the palette from the start
+_PALETTE_LEN = len(PRIMARY_NODE_COLORS)
+
+# Cytoscape stylesheet, built once at import and shared by every graph render
+_STYLESHEET = [
+    # General node styling
+    {
+        'selector': 'node',
+        'style': {
+            'label': 'data(label)',
+            'text-valign': 'center',
+            'text-halign': 'center',
+            'color': '#000',  # Text color
+            'font-size': '12px',
+            'shape': 'roundrectangle',
+            'width': 'label',
+            'height': 'label',
+            'padding': '20px',
+            'border-width': 2,
+            'border-color': '#555',
+            'background-color': 'data(color)',  # Dynamic color from node data
+            'content': 'data(label)',
+            'text-wrap': 'wrap',
+            'text-max-width': '150px',
+            'transition-property': 'background-color, border-color, width, height',
+            'transition-duration': '0.3s'
+        }
+    },
+    # Central Node Styling
+    {
+        'selector': '.central-node',
+        'style': {
+            'background-color': '#87CEEB',  # Specific color for central node
+            'font-size': '16px',
+            'font-weight': 'bold',
+        }
+    },
+    # Primary Nodes Styling
+    {
+        'selector': '.primary-node',
+        'style': {
+            'background-color': 'data(color)',  # Inherits color from node data
+        }
+    },
+    # Subnodes Styling
+    {
+        'selector': '.subnode',
+        'style': {
+            'background-color': 'data(color)',  # Inherits color from node data
+        }
+    },
+    # Edge Styling
+    {
+        'selector': 'edge',
+        'style': {
+            'line-color': '#888',
+            'width': 2,
+            'target-arrow-shape': 'triangle',
+            'target-arrow-color': '#888',
+            'curve-style': 'bezier',
+            'transition-property': 'line-color, width',
+            'transition-duration': '0.3s'
+        }
+    },
+    # Highlighted Node Styling
+    {
+        'selector': '.highlighted',
+        'style': {
+            'background-color': '#FFFF00',
+            'border-width': 4,
+            'border-color': '#000',
+            'width': 'label',
+            'height': 'label'
+        }
+    },
+    # Selected Node Styling
+    {
+        'selector': ':selected',
+        'style': {
+            'border-width': 4,
+            'border-color': '#000'
+        }
+    }
 ]
 
 def create_stylesheet():
     """
     Returns the Cytoscape stylesheet.
+
+    The stylesheet is a module-level constant shared between callers, so it
+    must not be modified in place.
     """
-    stylesheet = [
-        # General node styling
-        {
-            'selector': 'node',
-            'style': {
-                'label': 'data(label)',
-                'text-valign': 'center',
-                'text-halign': 'center',
-                'color': '#000',  # Text color
-                'font-size': '12px',
-                'shape': 'roundrectangle',
-                'width': 'label',
-                'height': 'label',
-                'padding': '20px',
-                'border-width': 2,
-                'border-color': '#555',
-                'background-color': 'data(color)',  # Dynamic color from node data
-                'content': 'data(label)',
-                'text-wrap': 'wrap',
-                'text-max-width': '150px',
-                'transition-property': 'background-color, border-color, width, height',
-                'transition-duration': '0.3s'
-            }
-        },
-        # Central Node Styling
-        {
-            'selector': '.central-node',
-            'style': {
-                'background-color': '#87CEEB',  # Specific color for central node
-                'font-size': '16px',
-                'font-weight': 'bold',
-            }
-        },
-        # Primary Nodes Styling
-        {
-            'selector': '.primary-node',
-            'style': {
-                'background-color': 'data(color)',  # Inherits color from node data
-            }
-        },
-        # Subnodes Styling
-        {
-            'selector': '.subnode',
-            'style': {
-                'background-color': 'data(color)',  # Inherits color from node data
-            }
-        },
-        # Edge Styling
-        {
-            'selector': 'edge',
-            'style': {
-                'line-color': '#888',
-                'width': 2,
-                'target-arrow-shape': 'triangle',
-                'target-arrow-color': '#888',
-                'curve-style': 'bezier',
-                'transition-property': 'line-color, width',
-                'transition-duration': '0.3s'
-            }
-        },
-        # Highlighted Node Styling
-        {
-            'selector': '.highlighted',
-            'style': {
-                'background-color': '#FFFF00',
-                'border-width': 4,
-                'border-color': '#000',
-                'width': 'label',
-                'height': 'label'
-            }
-        },
-        # Selected Node Styling
-        {
-            'selector': ':selected',
-            'style': {
-                'border-width': 4,
-                'border-color': '#000'
-            }
-        }
-    ]
-    logger.debug(f"Stylesheet created with {len(stylesheet)} style rules.")
-    return stylesheet
+    return _STYLESHEET
 
 # Database file path
 DATABASE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'graph_state.db')
 
+# The graph state is kept in a single row with this fixed ID
+GRAPH_STATE_ID = 1
+
 # =============================================================================
 # Database Management
 # =============================================================================
 
+# Each thread keeps its own connection, reused across database operations
+_thread_local = threading.local()
+
+def _open_db_connection():
+    """
+    Opens and configures a new SQLite database connection.
+
+    Returns:
+        sqlite3.Connection: The SQLite database connection object.
+    """
+    conn = sqlite3.connect(DATABASE_FILE, check_same_thread=False)
+    # With WAL journaling, NORMAL only syncs the WAL at checkpoints instead of on every commit
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA temp_store=MEMORY')
+    logger.debug(f"Connected to SQLite database at {DATABASE_FILE}")
+    return conn
+
 @contextmanager
 def get_db_connection():
     """
-    Context manager for SQLite database connection.
+    Context manager for the SQLite database connection of the current thread.
+
+    The connection is opened on first use in each thread and reused afterwards,
+    so operations don't reconnect and reconfigure the database every time.
+    Uncommitted changes are rolled back if the block raises.
 
     Yields:
         sqlite3.Connection: The SQLite database connection object.
     """
-    conn = None
+    conn = getattr(_thread_local, 'conn', None)
     try:
-        conn = sqlite3.connect(DATABASE_FILE)
-        logger.debug(f"Connected to SQLite database at {DATABASE_FILE}")
+        if conn is None:
+            conn = _thread_local.conn = _open_db_connection()
         yield conn
     except sqlite3.Error as e:
         logger.error(f"Database connection failed: {e}")
-        raise
-    finally:
-        if conn:
+        if conn is not None:
+            # Discard the connection; the next operation reconnects
+            _thread_local.conn = None
             conn.close()
             logger.debug("SQLite database connection closed.")
+        raise
+    except Exception:
+        if conn is not None:
+            conn.rollback()
+        raise
 
 def initialize_db():
     """
     Initializes the SQLite database by creating the 'graph_state' table if it does not exist.
+
+    Databases written by earlier versions may hold the state under another ID;
+    only the latest state is kept and it is moved to GRAPH_STATE_ID. Their
+    table is also rebuilt without AUTOINCREMENT, which saves the extra
+    'sqlite_sequence' bookkeeping on inserts.
     """
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
+            # Write-ahead logging is persistent, so it only needs to be enabled once
+            c.execute('PRAGMA journal_mode=WAL')
             c.execute('''
                 CREATE TABLE IF NOT EXISTS graph_state (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    state TEXT NOT NULL
+                    id INTEGER PRIMARY KEY,
+                    state BLOB NOT NULL
                 )
             ''')
+            c.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'graph_state'")
+            if 'AUTOINCREMENT' in c.fetchone()[0].upper():
+                logger.info("Rebuilding the 'graph_state' table without AUTOINCREMENT.")
+                # sqlite3 doesn't open a transaction for DDL statements; open one
+                # explicitly, so the rebuild and the ID migration below commit or
+                # roll back together and a failed rebuild is retried on the next start
+                c.execute('BEGIN')
+                c.execute('ALTER TABLE graph_state RENAME TO graph_state_old')
+                c.execute('''
+                    CREATE TABLE graph_state (
+                        id INTEGER PRIMARY KEY,
+                        state BLOB NOT NULL
+                    )
+                ''')
+                c.execute('INSERT INTO graph_state (id, state) SELECT id, state FROM graph_state_old')
+                c.execute('DROP TABLE graph_state_old')
+            # Migrate a state saved under an auto-assigned ID to the fixed row
+            c.execute(
+                'DELETE FROM graph_state WHERE id <> (SELECT MAX(id) FROM graph_state)'
+            )
+            c.execute(
+                'UPDATE graph_state SET id = ? WHERE id <> ?', (GRAPH_STATE_ID, GRAPH_STATE_ID)
+            )
             conn.commit()
             logger.info("Database initialized and 'graph_state' table ensured.")
+            if logger.isEnabledFor(logging.DEBUG):
+                # The state is looked up by its primary key; the plan should read
+                # "SEARCH graph_state USING INTEGER PRIMARY KEY (rowid=?)"
+                c.execute(
+                    'EXPLAIN QUERY PLAN SELECT state FROM graph_state WHERE id = ?', (GRAPH_STATE_ID,)
+                )
+                for row in c.fetchall():
+                    logger.debug("Graph state query plan: %s", row[-1])
     except sqlite3.Error as e:
         logger.error(f"Failed to initialize database: {e}")
         raise
@@ -170,13 +249,45 @@ initialize_db()
 # Utility Functions
 # =============================================================================
 
-def perform_fuzzy_search(search_value, all_labels):
+@lru_cache(maxsize=8)
+def build_label_index(labels):
+    """
+    Builds a suffix index over the given labels for fast substring search.
+
+    Every lowercased suffix of every label is stored in sorted order, so the
+    labels containing a search string are found by a binary search for the
+    suffixes starting with it. The index is cached per labels tuple.
+
+    Parameters:
+        labels (tuple): The node labels to index.
+
+    Returns:
+        dict: The indexed 'labels', their sorted lowercased 'suffixes', and the
+              'positions' of the label each suffix belongs to.
+    """
+    # Lowercase each label once rather than once per suffix
+    lowered = [label.lower() for label in labels]
+    entries = sorted(
+        (label[start:], position)
+        for position, label in enumerate(lowered)
+        for start in range(len(label))
+    )
+    logger.debug("Label index built with %s suffixes for %s labels.", len(entries), len(labels))
+    return {
+        'labels': labels,
+        'suffixes': [suffix for suffix, _ in entries],
+        'positions': [position for _, position in entries]
+    }
+
+def perform_fuzzy_search(search_value, all_labels, label_index=None):
     """
     Performs a case-insensitive substring search to find labels that contain the search value.
 
     Parameters:
         search_value (str): The search string input by the user.
         all_labels (list): The list of all node labels to search through.
+        label_index (dict, optional): A suffix index of `all_labels` built by
+            `build_label_index`; when given, it is searched instead of scanning the labels.
 
     Returns:
         list: A list of labels that contain the search string as a substring.
@@ -188,20 +299,51 @@ def perform_fuzzy_search(search_value, all_labels):
     try:
         # Convert search_value to lowercase for case-insensitive comparison
         search_value_lower = search_value.lower()
+        if label_index is not None:
+            # Suffixes starting with the search value belong to the matching labels
+            suffixes = label_index['suffixes']
+            start = bisect_left(suffixes, search_value_lower)
+            end = bisect_left(suffixes, search_value_lower + chr(0x10FFFF), lo=start)
+            positions = sorted(set(label_index['positions'][start:end]))
+            matching_labels = [label_index['labels'][position] for position in positions]
+            logger.debug("Indexed substring search results for '%s': %s", search_value, matching_labels)
+            return matching_labels
+
         # Find labels that contain the search_value as a substring
         matching_labels = [
             label for label in all_labels if search_value_lower in label.lower()
         ]
-        logger.debug(f"Substring search results for '{search_value}': {matching_labels}")
+        logger.debug("Substring search results for '%s': %s", search_value, matching_labels)
         return matching_labels
     except Exception as e:
         logger.error(f"Error during substring search: {e}")
         return []
 
+@lru_cache(maxsize=256)
+def search_labels(search_value, labels):
+    """
+    Returns the labels containing the search value, caching results per query.
+
+    Typing and deleting characters revisits earlier queries, which are then
+    answered from the cache instead of searching the label index again.
+
+    Parameters:
+        search_value (str): The search string input by the user.
+        labels (tuple): The node labels to search through.
+
+    Returns:
+        tuple: The labels that contain the search string as a substring.
+    """
+    return tuple(perform_fuzzy_search(search_value, labels, build_label_index(labels)))
+
+@lru_cache(maxsize=256)
 def lighten_color(hex_color, factor=0.5):
     """
     Lightens the given hex color by the specified factor.
 
+    Subnodes share their parent's color, so results are cached per
+    (color, factor) pair.
+
     Parameters:
         hex_color (str): The original color in hex format (e.g., '#1f77b4').
         factor (float, optional): The factor by which to lighten the color (0 to 1).
@@ -211,15 +353,16 @@ def lighten_color(hex_color, factor=0.5):
     """
     try:
         # Remove the '#' prefix if present
-        hex_color = hex_color.lstrip('#')
-        if len(hex_color) == 3:
+        digits = hex_color.lstrip('#')
+        if len(digits) == 3:
             # Expand shorthand hex color (e.g., 'abc' -> 'aabbcc')
-            hex_color = ''.join([c*2 for c in hex_color])
+            digits = digits[0] * 2 + digits[1] * 2 + digits[2] * 2
+        if len(digits) != 6:
+            raise ValueError("expected 3 or 6 hex digits")
 
-        # Convert hex to RGB
-        r = int(hex_color[0:2], 16)
-        g = int(hex_color[2:4], 16)
-        b = int(hex_color[4:6], 16)
+        # Convert hex to RGB with a single parse
+        value = int(digits, 16)
+        r, g, b = value >> 16, (value >> 8) & 0xFF, value & 0xFF
 
         # Calculate new RGB values
         r = int(r + (255 - r) * factor)
@@ -227,17 +370,56 @@ def lighten_color(hex_color, factor=0.5):
         b = int(b + (255 - b) * factor)
 
         # Format back to hex
-        lightened = '#{0:02X}{1:02X}{2:02X}'.format(r, g, b)
-        logger.debug(f"Lightened color from #{hex_color} to {lightened} with factor {factor}")
+        lightened = '#%06X' % ((r << 16) | (g << 8) | b)
+        logger.debug("Lightened color from %s to %s with factor %s", hex_color, lightened, factor)
         return lightened
     except Exception as e:
-        logger.error(f"Error lightening color '{hex_color}': {e}")
+        logger.error("Error lightening color '%s': %s", hex_color, e)
         return hex_color  # Return original color in case of error
 
+# Factor by which subnode colors are lightened from their parent's color
+SUBNODE_LIGHTEN_FACTOR = 0.6
+
+# Lightened variant of each primary color, computed once at import so
+# subnodes of primary nodes only need an index lookup
+LIGHT_PRIMARY_NODE_COLORS = tuple(
+    lighten_color(color, factor=SUBNODE_LIGHTEN_FACTOR) for color in PRIMARY_NODE_COLORS
+)
+
 # =============================================================================
 # Graph State Persistence Functions
 # =============================================================================
 
+def _encode_state(state):
+    """
+    Serializes a graph state for storage.
+
+    Parameters:
+        state (dict): The state dictionary containing elements, zoom, and pan.
+
+    Returns:
+        bytes: The zlib-compressed JSON of the state.
+    """
+    state_json = orjson.dumps(state)
+    state_blob = zlib.compress(state_json)
+    logger.debug("Graph state serialized: %s bytes, %s compressed.", len(state_json), len(state_blob))
+    return state_blob
+
+def _decode_state(stored):
+    """
+    Deserializes a graph state read from the database.
+
+    Parameters:
+        stored (bytes or str): A compressed state, or the plain JSON text
+            stored by earlier versions.
+
+    Returns:
+        dict: The state dictionary containing elements, zoom, and pan.
+    """
+    if isinstance(stored, bytes):
+        stored = zlib.decompress(stored)
+    return orjson.loads(stored)
+
 def save_graph_state(state):
     """
     Saves the graph state to the SQLite database.
@@ -249,14 +431,14 @@ def save_graph_state(state):
         bool: True if saved successfully, False otherwise.
     """
     try:
-        state_json = json.dumps(state)
-        logger.debug(f"Saving graph state: {state_json}")
+        state_blob = _encode_state(state)
         with get_db_connection() as conn:
             c = conn.cursor()
-            # Remove existing state to maintain only the latest
-            c.execute('DELETE FROM graph_state')
-            # Insert new state
-            c.execute('INSERT INTO graph_state (state) VALUES (?)', (state_json,))
+            # Insert the state, or replace it in place if it was saved before
+            c.execute('''
+                INSERT INTO graph_state (id, state) VALUES (?, ?)
+                ON CONFLICT (id) DO UPDATE SET state = excluded.state
+            ''', (GRAPH_STATE_ID, state_blob))
             conn.commit()
         logger.info("Graph state successfully saved to the database.")
         return True
@@ -278,12 +460,11 @@ def load_graph_state():
     try:
         with get_db_connection() as conn:
             c = conn.cursor()
-            # Retrieve the latest graph state entry
-            c.execute('SELECT state FROM graph_state ORDER BY id DESC LIMIT 1')
+            # Retrieve the graph state row
+            c.execute('SELECT state FROM graph_state WHERE id = ?', (GRAPH_STATE_ID,))
             row = c.fetchone()
             if row:
-                state_json = row[0]
-                state = json.loads(state_json)
+                state = _decode_state(row[0])
                 logger.info("Graph state successfully loaded from the database.")
                 return state
             else:
@@ -292,8 +473,8 @@ def load_graph_state():
     except sqlite3.Error as e:
         logger.error(f"SQLite error while loading graph state: {e}")
         return None
-    except json.JSONDecodeError as e:
-        logger.error(f"JSON decode error while loading graph state: {e}")
+    except (orjson.JSONDecodeError, zlib.error) as e:
+        logger.error(f"Decode error while loading graph state: {e}")
         return None
     except Exception as e:
         logger.error(f"Unexpected error while loading graph state: {e}")
@@ -303,6 +484,21 @@ def load_graph_state():
 # Graph Elements Construction
 # =============================================================================
 
+def is_edge(elem):
+    """
+    Returns whether a Cytoscape element is an edge.
+
+    Edges are the elements whose data has a 'source'; the classification is
+    done server-side, so the elements sent to the browser carry no flag for it.
+
+    Parameters:
+        elem (dict): A Cytoscape element.
+
+    Returns:
+        bool: True for edges, False for nodes.
+    """
+    return 'source' in elem['data']
+
 def load_graph_elements(central_node, primary_nodes, subnodes):
     """
     Constructs the graph elements for the Cytoscape component.
@@ -316,25 +512,33 @@ def load_graph_elements(central_node, primary_nodes, subnodes):
         list: A list of nodes and edges for the Cytoscape graph.
     """
     nodes = []
-    edges = []
+    # Bound once; they are called for every node below
+    add_node = nodes.append
+    debug = logger.debug
+    central_id = central_node['id']
 
     # Add central node
     central_node_data = {
-        'id': central_node['id'],
+        'id': central_id,
         'label': central_node['label'].replace('_', ' '),
         'description': central_node['description'],
         'notes': central_node.get('notes', ''),
         'color': '#87CEEB'  # Sky blue
     }
-    nodes.append({
+    add_node({
         'data': central_node_data,
         'classes': 'central-node'
     })
-    logger.debug(f"Added central node: {central_node_data}")
+    debug("Added central node: %s", central_node_data)
+
+    # Subnode colors of the primary nodes, taken from the precomputed palette
+    id_to_light_color = {}
 
     # Add primary nodes with assigned colors
     for i, (primary_id, primary_desc) in enumerate(primary_nodes.items()):
-        color = PRIMARY_NODE_COLORS[i % len(PRIMARY_NODE_COLORS)]
+        palette_index = i if i < _PALETTE_LEN else i % _PALETTE_LEN
+        color = PRIMARY_NODE_COLORS[palette_index]
+        id_to_light_color[primary_id] = LIGHT_PRIMARY_NODE_COLORS[palette_index]
         node_data = {
             'id': primary_id,
             'label': primary_id.replace('_', ' '),
@@ -342,26 +546,23 @@ def load_graph_elements(central_node, primary_nodes, subnodes):
             'notes': '',
             'color': color
         }
-        nodes.append({
+        add_node({
             'data': node_data,
             'classes': 'primary-node'
         })
-        logger.debug(f"Added primary node: {node_data}")
+        debug("Added primary node: %s", node_data)
 
-        # Create edge from central node to primary node
-        edges.append({
-            'data': {
-                'source': central_node['id'],
-                'target': primary_id,
-                'id': f"{central_node['id']}_to_{primary_id}"
-            }
-        })
+    # Map node IDs to colors once, so each parent's color is a single lookup
+    id_to_color = {node['data']['id']: node['data']['color'] for node in nodes}
 
     # Add subnodes with lighter colors
     for parent_id, children in subnodes.items():
-        parent_color = next((node['data']['color'] for node in nodes if node['data']['id'] == parent_id), '#FFFFFF')
+        light_color = id_to_light_color.get(parent_id)
+        if light_color is None:
+            # Parent is not a primary node; lighten its color directly
+            parent_color = id_to_color.get(parent_id, '#FFFFFF')
+            light_color = lighten_color(parent_color, factor=SUBNODE_LIGHTEN_FACTOR)
         for child_id, child_desc in children.items():
-            light_color = lighten_color(parent_color, factor=0.6)
             node_data = {
                 'id': child_id,
                 'label': child_id.replace('_', ' '),
@@ -369,20 +570,36 @@ def load_graph_elements(central_node, primary_nodes, subnodes):
                 'notes': '',
                 'color': light_color
             }
-            nodes.append({
+            add_node({
                 'data': node_data,
                 'classes': 'subnode'
             })
-            logger.debug(f"Added subnode: {node_data}")
-
-            # Create edge from primary node to subnode
-            edges.append({
-                'data': {
-                    'source': parent_id,
-                    'target': child_id,
-                    'id': f"{parent_id}_to_{child_id}"
-                }
-            })
+            debug("Added subnode: %s", node_data)
+
+    # Create edges from the central node to each primary node; edge IDs are
+    # built at runtime, so they are interned to share one object per ID
+    edges = [
+        {
+            'data': {
+                'source': central_id,
+                'target': primary_id,
+                'id': intern(f"{central_id}_to_{primary_id}")
+            }
+        }
+        for primary_id in primary_nodes
+    ]
+    # Create edges from each primary node to its subnodes
+    edges.extend(
+        {
+            'data': {
+                'source': parent_id,
+                'target': child_id,
+                'id': intern(f"{parent_id}_to_{child_id}")
+            }
+        }
+        for parent_id, children in subnodes.items()
+        for child_id in children
+    )
 
-    logger.debug(f"Total nodes: {len(nodes)}, Total edges: {len(edges)}")
+    debug("Total nodes: %s, Total edges: %s", len(nodes), len(edges))
     return nodes + edges